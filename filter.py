@@ -1,22 +1,12 @@
 import os
 import json
 import re
-from qwen_agent.agents import Assistant
-from PyPDF2 import PdfReader
+from llm_router import LLMError, run_assistant
+from pdf_extract import open_paper
+from parallel import run_parallel
 
-def pdf_to_text(pdf_path):
-    try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
-        return None
 
-
-def process_pdf_name(folder_path, llm_cfg):
+def process_pdf_name(folder_path, llm_cfg, workers=1, deadline=None):
     """
     Process PDF file names to ensure they match the title format with underscores.
     Uses an LLM agent to read the actual title from each PDF file.
@@ -24,6 +14,8 @@ def process_pdf_name(folder_path, llm_cfg):
     Args:
         folder_path (str): Path to the folder containing PDF files
         llm_cfg (dict): Configuration for the LLM agent
+        workers (int): Number of PDF files processed at once
+        deadline (float): time.monotonic() value after which no new file is started
     
     Returns:
         dict: Mapping of original file names to new file names (if changed)
@@ -34,18 +26,28 @@ def process_pdf_name(folder_path, llm_cfg):
     # Track renamed files
     renamed_files = {}
     
-    # Process each PDF file directly using LLM to extract title
-    for pdf_file in pdf_files:
+    def read_title(pdf_file):
         pdf_path = os.path.join(folder_path, pdf_file)
         
-        # Extract text from PDF
-        pdf_text = pdf_to_text(pdf_path)
-        if not pdf_text:
+        # Extract text from PDF, extract_title_with_llm only reads the first 4000
+        # characters, which take at most 4 bytes each in UTF-8
+        paper = open_paper(pdf_path)
+        if paper is None:
             print(f"Could not extract text from {pdf_file}")
-            continue
+            return None
+        with paper:
+            pdf_text = paper.head(4 * 4000)
             
         # Use LLM to extract the title if configuration is provided
         extracted_title = extract_title_with_llm(pdf_text, llm_cfg)
+        if not extracted_title:
+            print(f"Could not extract title from {pdf_file} using LLM")
+        return extracted_title
+    
+    # Extract the titles in parallel, rename one file at a time afterwards
+    titles, _ = run_parallel(read_title, pdf_files, workers, deadline)
+    
+    for pdf_file, extracted_title in zip(pdf_files, titles):
         if extracted_title:
             # Create the expected file name (title with spaces replaced by underscores)
             # Also remove any characters that might be problematic in file names
@@ -68,8 +70,6 @@ def process_pdf_name(folder_path, llm_cfg):
                     print(f"Renamed '{pdf_file}' to '{expected_name}'")
                 except Exception as e:
                     print(f"Error renaming {pdf_file} to {expected_name}: {e}")
-        else:
-            print(f"Could not extract title from {pdf_file} using LLM")
     
     return renamed_files
 
@@ -97,21 +97,13 @@ def extract_title_with_llm(pdf_text, llm_cfg):
         Do not include any other text in your response.
         '''
         
-        # Create the assistant
-        bot = Assistant(
-            llm=llm_cfg,
-            system_message=system_instruction
-        )
-        
         # Prepare the message with first 4000 characters (to avoid token limits)
         messages = [{
             'role': 'user', 
             'content': f'Paper text:\\n{pdf_text[:4000]}'
         }]
         
-        response = []
-        for response in bot.run(messages=messages):
-            pass
+        response = run_assistant(llm_cfg, system_instruction, messages)
         
         if response and len(response) > 0:
             content = response[-1]['content']
@@ -180,12 +172,6 @@ def check(pdf_text, llm_cfg, exclude_author, author_standard=None, inst_standard
     }}
     '''
     
-    # Create the assistant
-    bot = Assistant(
-        llm=llm_cfg,
-        system_message=system_instruction
-    )
-    
     # Prepare the message
     messages = [{
         'role': 'user', 
@@ -193,9 +179,7 @@ def check(pdf_text, llm_cfg, exclude_author, author_standard=None, inst_standard
     }]
     
     try:
-        response = []
-        for response in bot.run(messages=messages):
-            pass
+        response = run_assistant(llm_cfg, system_instruction, messages)
         
         if response and len(response) > 0:
             content = response[-1]['content']
@@ -205,22 +189,36 @@ def check(pdf_text, llm_cfg, exclude_author, author_standard=None, inst_standard
                 return result
             except json.JSONDecodeError:
                 return False
+    except LLMError:
+        raise
     except Exception as e:
         print(f"Error checking influential authors: {e}")
         return False
 
 
 def should_include_paper(pdf_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None):   
+    """
+    Returns:
+        dict: Influential author, institution and publication if the paper is included,
+            False if it is excluded, None if no model server could answer
+    """
     print(f"Processing paper: {pdf_path}")
     
-    # For the remaining checks, we need to read the PDF
-    pdf_text = pdf_to_text(pdf_path)
-    if not pdf_text:
+    # For the remaining checks, we need to read the PDF. Authors, institutions and
+    # venue are on the leading pages, so only those within the memory budget are loaded
+    paper = open_paper(pdf_path)
+    if paper is None:
         print(f"  -> Excluded: Could not read PDF")
         return False
+    with paper:
+        pdf_text = paper.head()
     
     # Check if paper is influential
-    result = check(pdf_text, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard)
+    try:
+        result = check(pdf_text, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard)
+    except LLMError as e:
+        print(f"  -> Failed: {e}")
+        return None
     try:
         if result['is_influential']:
             print(f"  -> Included: paper is influential")
@@ -232,32 +230,52 @@ def should_include_paper(pdf_path, llm_cfg, exclude_author, author_standard=None
         print(f"   -> Excluded: parsing error.")
         return False
 
-def filter_papers(folder_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None):        
-    # Results to store filtered papers
-    filtered_papers = []
-    
+def filter_papers(folder_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None, workers=1, deadline=None):        
+    filtered_papers, _, _ = _filter_folder(folder_path, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard, workers, deadline)
+    return filtered_papers
+
+
+def _filter_folder(folder_path, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard, workers, deadline):
+    # Returns the filtered papers, the PDF files not processed before the deadline
+    # and the PDF files no model server could answer for
     # Get all PDF files in the directory
     pdf_files = [f for f in os.listdir(folder_path) if f.endswith('.pdf')]
     
     print(f"Found {len(pdf_files)} PDF files")
     
-    # Process each paper
-    for i, pdf_file in enumerate(pdf_files):
+    def process(item):
+        i, pdf_file = item
         print(f"\n--- Processing paper {i+1}/{len(pdf_files)} ---")
                 
         pdf_path = os.path.join(folder_path, pdf_file)
         
         # Check if paper should be included
-        out = should_include_paper(pdf_path, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard)
-        if out:
-            filtered_papers.append({'file': pdf_file} | out)
+        return should_include_paper(pdf_path, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard)
     
-    return filtered_papers
+    # Process each paper
+    outs, skipped = run_parallel(process, list(enumerate(pdf_files)), workers, deadline)
+    
+    # Results to store filtered papers
+    filtered_papers = [{'file': pdf_file} | out for pdf_file, out in zip(pdf_files, outs) if out]
+    unprocessed = [pdf_file for _, pdf_file in skipped]
+    failed = [pdf_file for pdf_file, out in zip(pdf_files, outs) if out is None and pdf_file not in unprocessed]
+    
+    return filtered_papers, unprocessed, failed
+
+
+def one_folder(folder_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None, workers=1, deadline=None):        
+    """
+    Rename the PDF files in a folder after their titles and save the influential ones to filtered_papers.json.
 
+    Papers not processed before the deadline, or for which no model server
+    answered, keep their existing filtered_papers.json entries.
 
-def one_folder(folder_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None):        
+    Returns:
+        dict: Number of PDF files, of filtered papers, the PDF files not
+            processed before the deadline and those the LLM failed on
+    """
     # Process PDF names to ensure they match title format
-    renamed_files = process_pdf_name(folder_path, llm_cfg)
+    renamed_files = process_pdf_name(folder_path, llm_cfg, workers, deadline)
     if renamed_files:
         print(f"Renamed {len(renamed_files)} PDF files to match title format")
         print("Renamed files:")
@@ -265,20 +283,35 @@ def one_folder(folder_path, llm_cfg, exclude_author, author_standard=None, inst_
             print(f"  {old_name} -> {new_name}")
     
     # Filter papers
-    filtered_papers = filter_papers(folder_path, llm_cfg, exclude_author, author_standard=None, inst_standard=None, pub_standard=None)
+    filtered_papers, unprocessed, failed = _filter_folder(folder_path, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard, workers, deadline)
+    
+    output_file = folder_path + "/filtered_papers.json"
+    if (unprocessed or failed) and os.path.exists(output_file):
+        # Partial run: keep the previous verdicts of the papers not processed this time
+        with open(output_file, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        kept = [paper for paper in previous if paper['file'] in unprocessed or paper['file'] in failed]
+        print(f"Keeping {len(kept)} previously filtered papers that were not processed this time")
+        filtered_papers = kept + filtered_papers
     
     # Save results to a txt file
     if filtered_papers:
-        output_file = folder_path + "/filtered_papers.json"
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(filtered_papers, f, indent=4)
     
-    print(f"\nFiltered {len(filtered_papers)} papers out of {len([f for f in os.listdir(folder_path) if f.endswith('.pdf')])} total papers")
+    total = len([f for f in os.listdir(folder_path) if f.endswith('.pdf')])
+    print(f"\nFiltered {len(filtered_papers)} papers out of {total} total papers")
+    if unprocessed:
+        print(f"{len(unprocessed)} papers were not processed before the time budget ran out, rerun to process them")
+    if failed:
+        print(f"{len(failed)} papers failed because no model server answered, rerun to process them: {failed}")
     
     # Also print the results
     print("\nFiltered papers:")
     for paper in filtered_papers:
         print(f"  - {paper}")
+    
+    return {'papers': total, 'filtered': len(filtered_papers), 'unprocessed': unprocessed, 'failed': failed}
 
 def main():
     '''
@@ -1,7 +1,9 @@
 import os
 import pandas as pd
-from qwen_agent.agents import Assistant
-from PyPDF2 import PdfReader
+from llm_router import LLMError, run_assistant
+from pdf_extract import open_paper
+from prefilter import has_evaluative_context
+from parallel import run_parallel
 import json
 import re
 
@@ -12,19 +14,6 @@ def get_paper_title(folder):
         return f.read().strip()
 
 
-def pdf_to_text(pdf_path):
-    """Convert PDF to text"""
-    try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
-        return None
-
-
 def find_citation_index(paper_title, paper_text, llm_cfg):
     """Find the citation index of the target paper in the references"""
     
@@ -48,12 +37,6 @@ def find_citation_index(paper_title, paper_text, llm_cfg):
     If you cannot find the citation, set "citation_index" to null.
     '''
     
-    # Create the assistant
-    bot = Assistant(
-        llm=llm_cfg,
-        system_message=system_instruction
-    )
-    
     # Prepare the message with the paper text
     messages = [{
         'role': 'user', 
@@ -61,10 +44,7 @@ def find_citation_index(paper_title, paper_text, llm_cfg):
     }]  # Limiting text length to avoid token limits
     
     try:
-        response = []
-        for response in bot.run(messages=messages):
-            # Get the final response
-            pass
+        response = run_assistant(llm_cfg, system_instruction, messages)
         
         # Extract the content from the response
         if response and len(response) > 0:
@@ -84,6 +64,8 @@ def find_citation_index(paper_title, paper_text, llm_cfg):
                 "citation_index": None,
                 "explanation": "No response from LLM"
             }
+    except LLMError:
+        raise
     except Exception as e:
         print(f"Error finding citation index: {e}")
         return {
@@ -124,12 +106,6 @@ def find_paragraphs_with_citation(paper_text, citation_index, llm_cfg):
     If no paragraphs contain the citation, return an empty array for "paragraphs".
     '''
     
-    # Create the assistant
-    bot = Assistant(
-        llm=llm_cfg,
-        system_message=system_instruction
-    )
-    
     # Prepare the message with the paper text
     messages = [{
         'role': 'user', 
@@ -137,10 +113,7 @@ def find_paragraphs_with_citation(paper_text, citation_index, llm_cfg):
     }]  # Limiting text length to avoid token limits
     
     try:
-        response = []
-        for response in bot.run(messages=messages):
-            # Get the final response
-            pass
+        response = run_assistant(llm_cfg, system_instruction, messages)
         
         # Extract the content from the response
         if response and len(response) > 0:
@@ -160,6 +133,8 @@ def find_paragraphs_with_citation(paper_text, citation_index, llm_cfg):
                 "paragraphs": [],
                 "explanation": "No response from LLM"
             }
+    except LLMError:
+        raise
     except Exception as e:
         print(f"Error finding paragraphs with citation: {e}")
         return {
@@ -168,6 +143,32 @@ def find_paragraphs_with_citation(paper_text, citation_index, llm_cfg):
         }
 
 
+def find_paragraphs_in_paper(paper, citation_index, llm_cfg):
+    """Find paragraphs that contain the citation, one memory budget worth of pages at a time"""
+    chunks = paper.chunks()
+    first = next(chunks, None)
+    if first is None:
+        return {
+            "paragraphs": [],
+            "explanation": "No text extracted from the paper"
+        }
+    second = next(chunks, None)
+    if second is None:
+        # The whole paper fits into the budget
+        return find_paragraphs_with_citation(first[2], citation_index, llm_cfg)
+
+    paragraphs = []
+    explanations = []
+    for start, end, text in (first, second, *chunks):
+        result = find_paragraphs_with_citation(text, citation_index, llm_cfg)
+        paragraphs += result.get("paragraphs", [])
+        explanations.append(f"pages {start+1}-{end}: {result.get('explanation', '')}")
+    return {
+        "paragraphs": paragraphs,
+        "explanation": "; ".join(explanations)
+    }
+
+
 def analyze_paragraphs_for_positive_comments(paragraphs, citation_index, target_paper_title, llm_cfg):
     """Analyze paragraphs to determine if they contain positive comments about the cited paper"""
     
@@ -209,12 +210,6 @@ def analyze_paragraphs_for_positive_comments(paragraphs, citation_index, target_
     If no positive comments are found, set "has_positive_comments" to false and "positive_comments" to an empty array.
     '''
     
-    # Create the assistant
-    bot = Assistant(
-        llm=llm_cfg,
-        system_message=system_instruction
-    )
-    
     # Prepare the message with the paragraphs
     paragraphs_text = "\n\n".join(paragraphs)
     messages = [{
@@ -223,10 +218,7 @@ def analyze_paragraphs_for_positive_comments(paragraphs, citation_index, target_
     }]
     
     try:
-        response = []
-        for response in bot.run(messages=messages):
-            # Get the final response
-            pass
+        response = run_assistant(llm_cfg, system_instruction, messages)
         
         # Extract the content from the response
         if response and len(response) > 0:
@@ -250,6 +242,8 @@ def analyze_paragraphs_for_positive_comments(paragraphs, citation_index, target_
                 "positive_comments": [],
                 "explanation": "No response from LLM"
             }
+    except LLMError:
+        raise
     except Exception as e:
         print(f"Error analyzing paragraphs for positive comments: {e}")
         return {
@@ -260,19 +254,34 @@ def analyze_paragraphs_for_positive_comments(paragraphs, citation_index, target_
 
 
 def process_single_paper(paper_file, target_paper_title, llm_cfg, folder_path):
-    """Process a single paper file"""
+    """Process a single paper file, the result has 'failed' set if no model server answered"""
     print(f"Processing paper: {paper_file}")
     
-    # Convert PDF to text
+    # Extract the PDF into the on-disk cache, text is loaded page range by page range
     pdf_path = os.path.join(folder_path, paper_file)
-    paper_text = pdf_to_text(pdf_path)
+    paper = open_paper(pdf_path)
     
-    if paper_text is None:
+    if paper is None:
         return None
-        
-    # Step 1: Find citation index
+    
+    with paper:
+        try:
+            return _process_paper_text(paper, paper_file, target_paper_title, llm_cfg)
+        except LLMError as e:
+            print(f"  {e}")
+            return {
+                'paper_title': paper_file,
+                'has_positive_comments': False,
+                'positive_comments': [],
+                'failed': True,
+                'details': str(e)
+            }
+
+
+def _process_paper_text(paper, paper_file, target_paper_title, llm_cfg):
+    # Step 1: Find citation index, the references are on the trailing pages
     print(f"  Finding citation index...")
-    citation_result = find_citation_index(target_paper_title, paper_text, llm_cfg)
+    citation_result = find_citation_index(target_paper_title, paper.tail(), llm_cfg)
     citation_index = citation_result.get("citation_index")
     
     if not citation_index:
@@ -288,7 +297,7 @@ def process_single_paper(paper_file, target_paper_title, llm_cfg, folder_path):
     
     # Step 2: Find paragraphs with citation
     print(f"  Finding paragraphs with citation...")
-    paragraphs_result = find_paragraphs_with_citation(paper_text, citation_index, llm_cfg)
+    paragraphs_result = find_paragraphs_in_paper(paper, citation_index, llm_cfg)
     paragraphs = paragraphs_result.get("paragraphs", [])
     
     if not paragraphs:
@@ -302,6 +311,17 @@ def process_single_paper(paper_file, target_paper_title, llm_cfg, folder_path):
     
     print(f"  Found {len(paragraphs)} paragraphs with citation")
     
+    # Skip the LLM analysis when no paragraph has evaluative language around the citation
+    if not has_evaluative_context(paragraphs, citation_index):
+        print(f"  Skipped analysis: no evaluative language around the citation")
+        return {
+            'paper_title': paper_file,
+            'has_positive_comments': False,
+            'positive_comments': [],
+            'prefiltered': True,
+            'details': "No evaluative language around the citation"
+        }
+    
     # Step 3: Analyze paragraphs for positive comments
     print(f"  Analyzing paragraphs for positive comments...")
     analysis_result = analyze_paragraphs_for_positive_comments(
@@ -322,8 +342,24 @@ def process_single_paper(paper_file, target_paper_title, llm_cfg, folder_path):
     }
 
 
-def process_papers(folder, llm_cfg):
-    """Main function to process all papers and find those with positive comments"""
+def process_papers(folder, llm_cfg, workers=1, deadline=None):
+    """
+    Main function to process all papers and find those with positive comments
+
+    Args:
+        folder (str): Folder with title.txt and filtered_papers.json
+        llm_cfg (dict): Configuration for the LLM agent
+        workers (int): Number of papers processed at once
+        deadline (float): time.monotonic() value after which no new paper is started
+
+    Papers not processed before the deadline, or for which no model server
+    answered, keep their existing positive_comments.csv rows.
+
+    Returns:
+        dict: Number of papers, of papers with positive comments, of papers
+            skipped by the prefilter, the papers not processed before the
+            deadline and those the LLM failed on
+    """
     
     # Get the title of the given paper
     target_paper_title = get_paper_title(folder)
@@ -340,41 +376,72 @@ def process_papers(folder, llm_cfg):
     
     print(f"Found {len(paper_files)} PDF files to process...")
     
-    # Process each paper
-    for i, paper in enumerate(paper_files):
+    def process(item):
+        i, paper = item
         paper_file = paper['file']
         print(f"\n--- Processing paper {i+1}/{len(paper_files)} ---")
         
         try:
             result = process_single_paper(paper_file, target_paper_title, llm_cfg, folder)
             if result:
-                processed_papers.append(result)
-                
-                # If positive comments found, add to results
-                if result['has_positive_comments']:
-                    results.append({
-                        'target_title': target_paper_title,
-                        'paper_title': result['paper_title'],
-                        'author': paper['author'],
-                        'institution': paper['inst'],
-                        'publication': paper['pub'],
-                        'positive_comments': result['positive_comments']
-                    })
+                if result.get('failed'):
+                    print(f"✗ No model server answered for {paper_file}")
+                elif result['has_positive_comments']:
                     print(f"✓ Found positive comments in {paper_file}")
                 else:
                     print(f"✗ No positive comments found in {paper_file}")
             else:
                 print(f"✗ Failed to process {paper_file}")
+            return result
         except Exception as e:
             print(f"✗ Error processing {paper_file}: {e}")
+            return None
+    
+    # Process each paper
+    outs, deadline_skipped = run_parallel(process, list(enumerate(paper_files)), workers, deadline)
+    
+    for paper, result in zip(paper_files, outs):
+        if result:
+            processed_papers.append(result)
+            
+            # If positive comments found, add to results
+            if result['has_positive_comments']:
+                results.append({
+                    'target_title': target_paper_title,
+                    'paper_title': result['paper_title'],
+                    'author': paper['author'],
+                    'institution': paper['inst'],
+                    'publication': paper['pub'],
+                    'positive_comments': result['positive_comments']
+                })
+    
+    skipped = sum(1 for p in processed_papers if p.get('prefiltered'))
+    if skipped:
+        print(f"\nSkipped positive comment analysis of {skipped} papers without evaluative language")
+    
+    unprocessed = [paper['file'] for _, paper in deadline_skipped]
+    failed = [p['paper_title'] for p in processed_papers if p.get('failed')]
+    output_file = folder + '/positive_comments.csv'
+    df = pd.DataFrame(results)
+    if (unprocessed or failed) and os.path.exists(output_file):
+        # Partial run: keep the previous comments of the papers not processed this time
+        previous = pd.read_csv(output_file)
+        kept = previous[previous['paper_title'].isin(unprocessed + failed)]
+        print(f"\nKeeping previous positive comments of {len(kept)} papers that were not processed this time")
+        df = pd.concat([kept, df], ignore_index=True)
+    if unprocessed:
+        print(f"{len(unprocessed)} papers were not processed before the time budget ran out, rerun to process them")
+    if failed:
+        print(f"{len(failed)} papers failed because no model server answered, rerun to process them: {failed}")
     
     # Save results to CSV
-    if results:
-        df = pd.DataFrame(results)
-        df.to_csv(folder + '/positive_comments.csv', index=False)
-        print(f"\nSaved {len(results)} papers with positive comments to positive_comments.csv")
+    if len(df):
+        df.to_csv(output_file, index=False)
+        print(f"\nSaved {len(df)} papers with positive comments to positive_comments.csv")
     else:
         print("\nNo papers with positive comments found.")
+    
+    return {'papers': len(paper_files), 'positive': len(df), 'prefiltered': skipped, 'unprocessed': unprocessed, 'failed': failed}
 
 def main():
     process_papers("Example")
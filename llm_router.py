@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+
+# Router settings, can be overridden with a 'router' dict in llm_cfg
+DEFAULT_ROUTER_CFG = {
+    'max_attempts': 4,       # attempts per request, across all endpoints
+    'max_inflight': 8,       # requests queued on one endpoint at once
+    'base_backoff': 2.0,     # seconds an endpoint is skipped after its first error
+    'max_backoff': 120.0,    # upper bound of the exponential backoff
+    'max_wait': 600.0,       # seconds to wait for a free endpoint before giving up
+    'initial_latency': 1.0,  # assumed latency while no endpoint has answered yet
+    'failure_latency': 30.0, # latency a failed request counts as
+}
+
+class LLMError(Exception):
+    """Raised when a request could not be answered by any model server"""
+
+
+# Weight of the latest observation in the moving average of the latency
+LATENCY_ALPHA = 0.3
+
+
+class Endpoint:
+    """One OpenAI-compatible model server and its observed health"""
+
+    def __init__(self, url):
+        self.url = url
+        self.inflight = 0
+        self.latency = None
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.rejected = 0
+        self.max_inflight_seen = 0
+        self.last_error = None
+
+    def score(self, default_latency):
+        # Expected wait: observed latency times the queue ahead of us. Endpoints
+        # without observations are assumed to be as fast as the others on average.
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (self.inflight + 1)
+
+    def observe(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_ALPHA * (latency - self.latency)
+
+    def metrics(self):
+        return {
+            'url': self.url,
+            'requests': self.requests,
+            'successes': self.successes,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'avg_latency': round(self.latency, 3) if self.latency is not None else None,
+            'inflight': self.inflight,
+            'max_inflight': self.max_inflight_seen,
+            'last_error': self.last_error,
+        }
+
+
+class LLMRouter:
+    """
+    Spread LLM requests over several model servers.
+
+    Each request goes to the available endpoint with the lowest expected wait
+    (moving average latency times queue depth). An endpoint that fails is
+    skipped for an exponentially growing backoff and the request is retried on
+    another endpoint, so a slow or crashed server only delays papers instead
+    of dropping them.
+    """
+
+    def __init__(self, urls, router_cfg=None, assistant_cls=None):
+        if not urls:
+            raise ValueError("At least one model server is required")
+        if assistant_cls is None:
+            from qwen_agent.agents import Assistant as assistant_cls
+        self.assistant_cls = assistant_cls
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.cfg = DEFAULT_ROUTER_CFG | (router_cfg or {})
+        self.retries = 0
+        self.failures = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Reserve the best endpoint, waiting while all of them are busy or backing off"""
+        deadline = time.monotonic() + self.cfg['max_wait']
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [e for e in self.endpoints
+                         if e.cooldown_until <= now and e.inflight < self.cfg['max_inflight']]
+                if ready:
+                    observed = [e.latency for e in self.endpoints if e.latency is not None]
+                    default = sum(observed) / len(observed) if observed else self.cfg['initial_latency']
+                    endpoint = min(ready, key=lambda e: e.score(default))
+                    endpoint.inflight += 1
+                    endpoint.requests += 1
+                    endpoint.max_inflight_seen = max(endpoint.max_inflight_seen, endpoint.inflight)
+                    return endpoint
+                if now >= deadline:
+                    raise TimeoutError("No model server became available")
+                # Wake up when an endpoint is released or its backoff ends
+                cooldowns = [e.cooldown_until for e in self.endpoints if e.cooldown_until > now]
+                timeout = min(cooldowns) - now if cooldowns else deadline - now
+                self._cond.wait(min(timeout, deadline - now))
+
+    def release(self, endpoint, latency=None, error=None):
+        """Record the outcome of a request on `endpoint`"""
+        with self._cond:
+            endpoint.inflight -= 1
+            if error is None:
+                endpoint.successes += 1
+                endpoint.consecutive_errors = 0
+                endpoint.observe(latency)
+            elif not _is_retryable(error):
+                # The request itself is bad (e.g. too long), the server is healthy
+                endpoint.rejected += 1
+                endpoint.last_error = str(error)
+            else:
+                # A failure counts as a slow answer, so the endpoint stays less
+                # preferred after its backoff ends
+                endpoint.observe(max(latency or 0.0, self.cfg['failure_latency']))
+                endpoint.errors += 1
+                endpoint.consecutive_errors += 1
+                endpoint.last_error = str(error)
+                backoff = min(self.cfg['base_backoff'] * 2 ** (endpoint.consecutive_errors - 1),
+                              self.cfg['max_backoff'])
+                # Jitter keeps workers from hitting a recovering server all at once
+                endpoint.cooldown_until = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+            self._cond.notify_all()
+
+    def run(self, llm_cfg, system_message, messages):
+        """
+        Run an Assistant on the routed endpoints until one answers.
+
+        Args:
+            llm_cfg (dict): Configuration for the LLM agent
+            system_message (str): System instruction of the Assistant
+            messages (list): Messages to send
+
+        Returns:
+            list: The final response of the Assistant
+
+        Raises:
+            LLMError: If every attempt failed or the request was rejected,
+                caused by the last error
+        """
+        last_error = None
+        for attempt in range(self.cfg['max_attempts']):
+            if attempt > 0:
+                with self._cond:
+                    self.retries += 1
+            endpoint = self.acquire()
+            cfg = {k: v for k, v in llm_cfg.items() if k not in ('model_server', 'model_servers', 'router')}
+            if endpoint.url is not None:
+                cfg['model_server'] = endpoint.url
+            start = time.monotonic()
+            try:
+                bot = self.assistant_cls(llm=cfg, system_message=system_message)
+                response = []
+                for response in bot.run(messages=messages):
+                    pass
+            except Exception as e:
+                self.release(endpoint, latency=time.monotonic() - start, error=e)
+                last_error = e
+                print(f"  LLM request to {endpoint.url} failed (attempt {attempt+1}/{self.cfg['max_attempts']}): {e}")
+                if not _is_retryable(e):
+                    break
+                continue
+            self.release(endpoint, latency=time.monotonic() - start)
+            return response
+        with self._cond:
+            self.failures += 1
+        raise LLMError(f"No model server answered: {last_error}") from last_error
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'retries': self.retries,
+                'failures': self.failures,
+                'endpoints': [e.metrics() for e in self.endpoints],
+            }
+
+
+def _status(error):
+    # qwen_agent wraps the OpenAI client error as ModelServiceError(exception=...)
+    # with code=None, so look at the wrapped exceptions as well
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for attr in ('status_code', 'code', 'status'):
+            try:
+                return int(getattr(error, attr, None))
+            except (TypeError, ValueError):
+                pass
+        error = getattr(error, 'exception', None) or error.__cause__
+    return None
+
+
+def _is_retryable(error):
+    # Client errors other than timeouts and rate limits fail the same way on every server
+    status = _status(error)
+    if status is None:
+        return True
+    return not (400 <= status < 500 and status not in (408, 429))
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(llm_cfg):
+    """Return the shared router of the servers in llm_cfg ('model_servers' or 'model_server')"""
+    urls = tuple(llm_cfg.get('model_servers') or [llm_cfg.get('model_server')])
+    with _routers_lock:
+        if urls not in _routers:
+            _routers[urls] = LLMRouter(list(urls), llm_cfg.get('router'))
+        return _routers[urls]
+
+
+def run_assistant(llm_cfg, system_message, messages):
+    """Run an Assistant through the router of llm_cfg, returns the final response"""
+    return get_router(llm_cfg).run(llm_cfg, system_message, messages)
+
+
+def router_metrics():
+    """Per-endpoint metrics of every router used so far, for the run report"""
+    with _routers_lock:
+        routers = list(_routers.values())
+    return [r.metrics() for r in routers]
+
+
+def reset_routers():
+    """Forget the shared routers and their metrics, so a report only covers its own run"""
+    with _routers_lock:
+        _routers.clear()
@@ -1,12 +1,21 @@
 from filter import one_folder
 from filter_comment import process_papers
+from pdf_extract import configure_backends, configure_cache
+from llm_router import reset_routers, router_metrics
+from prefilter import configure_prefilter, prefilter_stats, reset_prefilter_stats
 import os
+import json
+import time
+import argparse
 import pandas as pd
 
 # LLM configuration, please refer to the README of qwen-agent
 llm_cfg = {
         'model': 'your local model name',
         'model_server': 'your local model address',
+        # To spread requests over several OpenAI-compatible servers, list them instead:
+        # 'model_servers': ['http://server1:8000/v1', 'http://server2:8000/v1'],
+        # 'router': {'max_attempts': 4, 'max_inflight': 8},  # see llm_router.DEFAULT_ROUTER_CFG
         # 'api_key': 'YOUR_DASHSCOPE_API_KEY',  # Will use DASHSCOPE_API_KEY environment variable
         'generate_cfg': {
             'max_input_tokens': 100000,
@@ -29,25 +38,177 @@ inst_standard = '''
 pub_standard = '''
     1. Nature, Science and Cell
 '''
+# PDF text extraction backends, tried in order for each page. 'pymupdf' and 'pypdfium2'
+# are faster but optional (pip install pymupdf pypdfium2), 'pypdf2' is always available
+pdf_backends = ['pymupdf', 'pypdfium2', 'pypdf2']
+# Extracted text is cached on disk (default: a .citeglow_cache folder next to the PDFs)
+# and read through memory maps, at most memory_budget bytes of text are loaded at once
+cache_dir = None
+memory_budget = 1024 * 1024
+# Papers whose citation contexts all score below this on the praise lexicon in prefilter.py
+# skip the positive comment analysis. Lower it to send more papers to the LLM, None disables it
+praise_threshold = 1.0
+# Number of papers processed at once, keep it within what your model servers can handle
+workers = 1
+# Seconds after which no new paper is started, None for no limit
+time_budget = None
 
-def main():
-    for name in os.listdir():
-        if os.path.isdir(name) and os.path.exists(name + "/title.txt"):
+STAGES = ['filter', 'comments', 'merge']
+
+def default_config():
+    """The settings above as a config dict, the keys a config file may override"""
+    return {
+        'llm_cfg': llm_cfg,
+        'exclude_author': exclude_author,
+        'author_standard': author_standard,
+        'inst_standard': inst_standard,
+        'pub_standard': pub_standard,
+        'pdf_backends': pdf_backends,
+        'cache_dir': cache_dir,
+        'memory_budget': memory_budget,
+        'praise_threshold': praise_threshold,
+        'workers': workers,
+        'time_budget': time_budget,
+        'stages': STAGES,
+        'targets': None,      # folder names to process, None for all folders with title.txt
+        'root': '.',          # folder containing the paper folders
+        'output': 'final.csv',
+        'report': 'run_report.json',
+    }
+
+
+def load_config(path=None, **overrides):
+    """
+    Build a config from the defaults, a JSON config file and explicit overrides.
+
+    Args:
+        path (str): JSON file with any keys of default_config()
+        **overrides: Values taking precedence over the file, None values are ignored
+
+    Returns:
+        dict: The config
+    """
+    config = default_config()
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(config)
+        if unknown:
+            raise ValueError(f"Unknown config keys in {path}: {sorted(unknown)}")
+        config |= file_config
+    config |= {k: v for k, v in overrides.items() if v is not None}
+    # Config files may list stages and targets as a comma separated string, like the CLI
+    for key in ('stages', 'targets'):
+        if isinstance(config[key], str):
+            config[key] = [s.strip() for s in config[key].split(',') if s.strip()]
+    unknown = set(config['stages']) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}, choose from {STAGES}")
+    return config
+
+
+def run(config):
+    """
+    Run the selected stages of CiteGlow.
+
+    Args:
+        config (dict): Config from load_config()
+
+    Returns:
+        dict: The run report, also saved to config['report']
+    """
+    configure_backends(config['pdf_backends'])
+    configure_cache(config['cache_dir'], config['memory_budget'])
+    configure_prefilter(config['praise_threshold'])
+    # The report covers this run only, also when run() is called several times in one process
+    reset_routers()
+    reset_prefilter_stats()
+    deadline = time.monotonic() + config['time_budget'] if config['time_budget'] is not None else None
+
+    root = config['root']
+    folders = [name for name in sorted(os.listdir(root))
+               if os.path.isdir(os.path.join(root, name)) and os.path.exists(os.path.join(root, name, "title.txt"))]
+    if config['targets']:
+        missing = set(config['targets']) - set(folders)
+        if missing:
+            print(f"Skipping targets without title.txt: {sorted(missing)}")
+        folders = [name for name in folders if name in config['targets']]
+
+    report = {'stages': {}}
+    if 'filter' in config['stages']:
+        start = time.monotonic()
+        report['filter'] = {}
+        for name in folders:
             # save filtered_paper.json to name folder
-            one_folder(name, llm_cfg, exclude_author, author_standard, inst_standard, pub_standard)
-    for name in os.listdir():
-        if os.path.isdir(name) and os.path.exists(name + "/filtered_papers.json"):
-            # save positive_comments.csv to name folder
-            process_papers(name, llm_cfg) 
-
-    # Merge all the positve comments
-    df = pd.DataFrame(columns=['index', 'target_title', 'paper_title', 'author', 'institution', 'publication', 'positive_comments'])
-    for name in os.listdir():
-        if os.path.isdir(name) and os.path.exists(name + '/positive_comments.csv'):
-            new_df = pd.read_csv(name + '/positive_comments.csv')
-            df = pd.concat([df, new_df], ignore_index=True)
-    df.to_csv("final.csv")
+            report['filter'][name] = one_folder(
+                os.path.join(root, name), config['llm_cfg'], config['exclude_author'],
+                config['author_standard'], config['inst_standard'], config['pub_standard'],
+                config['workers'], deadline)
+        report['stages']['filter'] = round(time.monotonic() - start, 1)
+
+    if 'comments' in config['stages']:
+        start = time.monotonic()
+        report['comments'] = {}
+        for name in folders:
+            if os.path.exists(os.path.join(root, name, "filtered_papers.json")):
+                # save positive_comments.csv to name folder
+                report['comments'][name] = process_papers(
+                    os.path.join(root, name), config['llm_cfg'], config['workers'], deadline)
+        report['stages']['comments'] = round(time.monotonic() - start, 1)
+
+    if 'merge' in config['stages']:
+        # Merge the positive comments of all folders, not only the targets, so that
+        # rerunning a subset keeps final.csv complete
+        df = pd.DataFrame(columns=['index', 'target_title', 'paper_title', 'author', 'institution', 'publication', 'positive_comments'])
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name, 'positive_comments.csv')
+            if os.path.isdir(os.path.join(root, name)) and os.path.exists(path):
+                new_df = pd.read_csv(path)
+                df = pd.concat([df, new_df], ignore_index=True)
+        df.to_csv(config['output'])
+
+    # Per-endpoint LLM metrics and papers skipped by the prefilter
+    report['llm_routers'] = router_metrics()
+    report['prefilter'] = prefilter_stats()
+    with open(config['report'], "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find influential citing papers and their positive comments on your work.")
+    parser.add_argument('-c', '--config', help="JSON config file, keys as in default_config() of main.py")
+    parser.add_argument('--root', help="folder containing the paper folders (default: current folder)")
+    parser.add_argument('--stages', help=f"comma separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument('--targets', nargs='+', help="only process these paper folders")
+    parser.add_argument('-j', '--workers', type=int, help="number of papers processed at once")
+    parser.add_argument('--time-budget', type=float, help="seconds after which no new paper is started")
+    parser.add_argument('--cache-dir', help="directory of the extracted text cache")
+    parser.add_argument('--memory-budget', type=int, help="maximum bytes of text loaded at once per worker")
+    parser.add_argument('--praise-threshold', type=float, help="minimum praise score for the positive comment analysis")
+    parser.add_argument('--backends', help="comma separated PDF extraction backends, in order")
+    parser.add_argument('-o', '--output', help="merged csv file (default: final.csv)")
+    parser.add_argument('--report', help="run report file (default: run_report.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(
+        args.config,
+        root=args.root,
+        stages=args.stages.split(',') if args.stages else None,
+        targets=args.targets,
+        workers=args.workers,
+        time_budget=args.time_budget,
+        cache_dir=args.cache_dir,
+        memory_budget=args.memory_budget,
+        praise_threshold=args.praise_threshold,
+        pdf_backends=args.backends.split(',') if args.backends else None,
+        output=args.output,
+        report=args.report,
+    )
+    run(config)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,37 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_parallel(func, items, workers=1, deadline=None):
+    """
+    Apply func to each item with a pool of worker threads.
+
+    Items that have not started when the deadline passes are not processed.
+
+    Args:
+        func (callable): Function applied to each item
+        items (list): Items to process
+        workers (int): Number of items processed at once
+        deadline (float): time.monotonic() value after which no new item starts
+
+    Returns:
+        tuple: List of results in the order of items (None for items not
+            processed) and the list of items skipped because of the deadline
+    """
+    skipped = set()
+
+    def call(indexed):
+        i, item = indexed
+        if deadline is not None and time.monotonic() >= deadline:
+            skipped.add(i)
+            return None
+        return func(item)
+
+    if workers <= 1:
+        results = [call(indexed) for indexed in enumerate(items)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(call, enumerate(items)))
+    if skipped:
+        print(f"Time budget exhausted, skipped {len(skipped)} of {len(items)} items")
+    return results, [item for i, item in enumerate(items) if i in skipped]
@@ -0,0 +1,421 @@
+import os
+import sys
+import json
+import mmap
+import time
+import hashlib
+import threading
+
+# Optional faster backends, used only when installed
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+
+class PyMuPDFExtractor:
+    """C-backed extractor based on PyMuPDF (fitz)"""
+    name = 'pymupdf'
+
+    def available(self):
+        return fitz is not None
+
+    def open(self, pdf_path):
+        return _PyMuPDFDocument(fitz.open(pdf_path))
+
+
+class _PyMuPDFDocument:
+    def __init__(self, doc):
+        self.doc = doc
+
+    def __len__(self):
+        return self.doc.page_count
+
+    def page_text(self, i):
+        return self.doc.load_page(i).get_text()
+
+    def close(self):
+        self.doc.close()
+
+
+class PdfiumExtractor:
+    """C-backed extractor based on pypdfium2"""
+    name = 'pypdfium2'
+
+    def available(self):
+        return pdfium is not None
+
+    def open(self, pdf_path):
+        return _PdfiumDocument(pdfium.PdfDocument(pdf_path))
+
+
+class _PdfiumDocument:
+    def __init__(self, doc):
+        self.doc = doc
+
+    def __len__(self):
+        return len(self.doc)
+
+    def page_text(self, i):
+        page = self.doc[i]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+
+    def close(self):
+        self.doc.close()
+
+
+class PyPDF2Extractor:
+    """Pure-Python extractor based on PyPDF2, always available"""
+    name = 'pypdf2'
+
+    def available(self):
+        return True
+
+    def open(self, pdf_path):
+        from PyPDF2 import PdfReader
+        return _PyPDF2Document(PdfReader(pdf_path))
+
+
+class _PyPDF2Document:
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader.pages)
+
+    def page_text(self, i):
+        return self.reader.pages[i].extract_text()
+
+    def close(self):
+        pass
+
+
+EXTRACTORS = {e.name: e for e in (PyMuPDFExtractor(), PdfiumExtractor(), PyPDF2Extractor())}
+
+# Preferred order of backends, fastest first. Unavailable backends are skipped.
+backends = ['pymupdf', 'pypdfium2', 'pypdf2']
+
+
+def configure_backends(names):
+    """
+    Set the order in which extraction backends are tried.
+
+    Args:
+        names (list): Backend names, e.g. ['pymupdf', 'pypdf2']
+    """
+    global backends
+    unknown = [n for n in names if n not in EXTRACTORS]
+    if unknown:
+        raise ValueError(f"Unknown PDF backends: {unknown}, choose from {list(EXTRACTORS)}")
+    backends = list(names)
+
+
+def available_backends(names=None):
+    """Return the extractors in `names` (default: configured order) that are installed"""
+    names = backends if names is None else names
+    return [EXTRACTORS[n] for n in names if EXTRACTORS[n].available()]
+
+
+def iter_pages(pdf_path, names=None):
+    """
+    Yield the text of each page of a PDF, one page at a time.
+
+    The first backend that opens the file decides the page count. Each page is
+    read with that backend; if it raises or returns None, the remaining
+    backends are tried for that page only. A page no backend can read yields
+    an empty string instead of dropping the whole document.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        names (list): Backend names to try in order (default: configured order)
+
+    Yields:
+        str: Text of each page
+    """
+    chain = available_backends(names)
+    if not chain:
+        raise RuntimeError("No PDF extraction backend is available")
+
+    docs = {}
+    try:
+        primary = None
+        errors = []
+        for extractor in chain:
+            try:
+                docs[extractor.name] = extractor.open(pdf_path)
+                primary = extractor
+                break
+            except Exception as e:
+                errors.append(f"{extractor.name}: {e}")
+        if primary is None:
+            raise RuntimeError("; ".join(errors))
+
+        for i in range(len(docs[primary.name])):
+            yield _page_text(pdf_path, i, chain, docs)
+    finally:
+        for doc in docs.values():
+            if doc is None:
+                continue
+            try:
+                doc.close()
+            except Exception:
+                pass
+
+
+def _page_text(pdf_path, i, chain, docs):
+    for extractor in chain:
+        if extractor.name not in docs:
+            try:
+                docs[extractor.name] = extractor.open(pdf_path)
+            except Exception as e:
+                # Remember the failure so the backend is not opened again for every page
+                print(f"  {extractor.name} could not open {pdf_path}: {e}")
+                docs[extractor.name] = None
+        if docs[extractor.name] is None:
+            continue
+        try:
+            text = docs[extractor.name].page_text(i)
+        except Exception as e:
+            print(f"  {extractor.name} failed on page {i+1} of {pdf_path}: {e}")
+            continue
+        if text is not None:
+            return text
+    print(f"  Could not extract page {i+1} of {pdf_path}, skipping it")
+    return ""
+
+
+# Directory of the on-disk extraction cache. None keeps a `.citeglow_cache`
+# folder next to each PDF.
+cache_dir = None
+# Maximum bytes of document text a worker materializes at once. None means no limit.
+memory_budget = 1024 * 1024
+# Bump when the layout of cache entries changes, so stale entries are not reused
+CACHE_VERSION = 2
+
+
+def configure_cache(path=None, budget=None):
+    """
+    Set the extraction cache directory and the per-worker memory budget.
+
+    Args:
+        path (str): Cache directory, None keeps the cache next to each PDF
+        budget (int): Maximum bytes of text materialized at once, None for no limit
+    """
+    global cache_dir, memory_budget
+    cache_dir = path
+    memory_budget = budget
+
+
+def _file_digest(pdf_path):
+    # Hash the content rather than the path so renamed files still hit the cache
+    h = hashlib.sha1()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extract_to_cache(pdf_path, names=None):
+    """
+    Extract a PDF page by page into the on-disk cache, unless already cached.
+
+    Pages are written to `<key>.txt` as they are read, so the full text is
+    never held in memory. `<key>.json` stores the byte offset of each page. The
+    key covers the file content, the backend chain and the cache version.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        names (list): Backend names to try in order (default: configured order)
+
+    Returns:
+        tuple: Paths of the text file and of the page offsets file
+    """
+    folder = cache_dir or os.path.join(os.path.dirname(pdf_path), '.citeglow_cache')
+    os.makedirs(folder, exist_ok=True)
+    # The backends that are actually used are part of the key, so configuring or
+    # installing another backend re-extracts the file (including unreadable pages)
+    chain = [e.name for e in available_backends(names)]
+    key = f"{CACHE_VERSION}:{','.join(chain)}:{_file_digest(pdf_path)}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    text_path = os.path.join(folder, digest + '.txt')
+    index_path = os.path.join(folder, digest + '.json')
+    if os.path.exists(text_path) and os.path.exists(index_path):
+        return text_path, index_path
+
+    # Write to temporary files first so concurrent workers never see a partial entry
+    suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+    offsets = [0]
+    try:
+        with open(text_path + suffix, 'wb') as f:
+            for page in iter_pages(pdf_path, names):
+                f.write((page + "\n").encode('utf-8', errors='replace'))
+                offsets.append(f.tell())
+        with open(index_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump({'file': os.path.basename(pdf_path), 'backends': chain, 'offsets': offsets}, f)
+        os.replace(text_path + suffix, text_path)
+        os.replace(index_path + suffix, index_path)
+    finally:
+        for path in (text_path + suffix, index_path + suffix):
+            if os.path.exists(path):
+                os.remove(path)
+    return text_path, index_path
+
+
+class PaperText:
+    """
+    Memory-mapped view of the cached text of one PDF.
+
+    Text is only decoded for the page ranges that are asked for, so holding a
+    PaperText costs almost no memory regardless of the document size.
+    """
+
+    def __init__(self, text_path, index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            self.offsets = json.load(f)['offsets']
+        self._file = open(text_path, 'rb')
+        if self.offsets[-1] > 0:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b''
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def nbytes(self):
+        return self.offsets[-1]
+
+    def pages(self, start=0, end=None, max_bytes=None):
+        """Return the text of pages [start, end), cut to at most `max_bytes` bytes"""
+        end = len(self) if end is None else min(end, len(self))
+        lo, hi = self.offsets[start], self.offsets[end]
+        if max_bytes is not None:
+            hi = min(hi, lo + max_bytes)
+        return self._data[lo:hi].decode('utf-8', errors='ignore')
+
+    def head(self, max_bytes=None):
+        """Text of the leading pages that fit into the budget (title, authors, venue)"""
+        max_bytes = memory_budget if max_bytes is None else max_bytes
+        return self.pages(0, None, max_bytes)
+
+    def tail(self, max_bytes=None):
+        """Text of the trailing whole pages that fit into the budget (references)"""
+        max_bytes = memory_budget if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return self.pages()
+        start = len(self)
+        while start > 0 and self.nbytes - self.offsets[start - 1] <= max_bytes:
+            start -= 1
+        if start == len(self) and len(self) > 0:
+            # Not even the last page fits, keep its beginning
+            return self.pages(start - 1, None, max_bytes)
+        return self.pages(start)
+
+    def chunks(self, max_bytes=None):
+        """
+        Split the document into consecutive page ranges within the budget.
+
+        Yields:
+            tuple: (start, end, text) for each page range, a single page larger
+                than the budget forms its own range and is cut to the budget
+        """
+        max_bytes = memory_budget if max_bytes is None else max_bytes
+        if max_bytes is None:
+            if len(self) > 0:
+                yield 0, len(self), self.pages()
+            return
+        start = 0
+        while start < len(self):
+            end = start + 1
+            while end < len(self) and self.offsets[end + 1] - self.offsets[start] <= max_bytes:
+                end += 1
+            yield start, end, self.pages(start, end, max_bytes)
+            start = end
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+def open_paper(pdf_path, names=None):
+    """Extract (or reuse the cached extraction of) a PDF, returns None if it cannot be read"""
+    try:
+        return PaperText(*extract_to_cache(pdf_path, names))
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {e}")
+        return None
+
+
+def benchmark(pdf_paths, names=None):
+    """
+    Time each installed backend on its own over the given PDF files.
+
+    Args:
+        pdf_paths (list): Paths to the PDF files
+        names (list): Backend names to compare (default: all known backends)
+
+    Returns:
+        dict: Per-backend seconds, pages, characters and failed pages/files
+    """
+    names = list(EXTRACTORS) if names is None else names
+    stats = {}
+    for extractor in available_backends(names):
+        s = {'seconds': 0.0, 'pages': 0, 'chars': 0, 'failed_pages': 0, 'failed_files': 0}
+        for pdf_path in pdf_paths:
+            start = time.perf_counter()
+            try:
+                doc = extractor.open(pdf_path)
+            except Exception:
+                s['failed_files'] += 1
+                s['seconds'] += time.perf_counter() - start
+                continue
+            try:
+                for i in range(len(doc)):
+                    try:
+                        text = doc.page_text(i)
+                    except Exception:
+                        text = None
+                    s['pages'] += 1
+                    if text is None:
+                        s['failed_pages'] += 1
+                    else:
+                        s['chars'] += len(text)
+            finally:
+                doc.close()
+            s['seconds'] += time.perf_counter() - start
+        stats[extractor.name] = s
+    return stats
+
+
+def main():
+    # Usage: python3 pdf_extract.py folder_or_pdf [...]
+    pdf_paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            pdf_paths += [os.path.join(arg, f) for f in os.listdir(arg) if f.endswith('.pdf')]
+        else:
+            pdf_paths.append(arg)
+    print(f"Benchmarking on {len(pdf_paths)} PDF files")
+    for name, s in benchmark(pdf_paths).items():
+        print(f"{name:10s} {s['seconds']:8.2f}s  {s['pages']} pages  {s['chars']} chars  "
+              f"{s['failed_pages']} failed pages  {s['failed_files']} failed files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import re
+import threading
+
+# Weighted praise patterns, matched case-insensitively against the sentences that
+# cite the paper. Generic academic vocabulary ("high", "better", "improve", ...) is
+# left out on purpose, it shows up in neutral citations just as often.
+PRAISE_LEXICON = [
+    (r'\bfirst (?:to|work|method|approach|attempt)\b', 2.0),
+    (r'\bstate[- ]of[- ]the[- ]art\b', 2.0),
+    (r'\bSOTA\b', 2.0),
+    (r'\boutperform\w*', 2.0),
+    (r'\bpioneer\w*', 2.0),
+    (r'\bseminal\b', 2.0),
+    (r'\bbreakthrough\w*', 2.0),
+    (r'\blandmark\b', 2.0),
+    (r'\b(?:remarkabl|impressiv|excellent|outstanding|superior)\w*', 2.0),
+    (r'\bsignificant(?:ly)? (?:improv|advanc|boost|reduc|speed)\w*', 2.0),
+    (r'\b(?:effective|efficient|promising|powerful|elegant|robust|notable|competitive)\w*', 1.0),
+    (r'\b(?:widely (?:used|adopted)|popular|influential|inspired by|builds? (?:on|upon))\b', 1.0),
+    (r'\bachiev\w* (?:high|strong|good|better|superior|competitive|excellent|promising)\b', 1.0),
+    (r'\bimprov\w* (?:the )?(?:accuracy|performance|efficiency|speed|results)\b', 1.0),
+    (r'\bnovel\b', 1.0),
+    (r'\bnew (?:\w+ ){0,2}(?:method|approach|model|architecture|framework|neuron|technique|algorithm|paradigm|idea|mechanism)s?\b', 1.0),
+    (r'\b(?:greatly|substantially|considerably|dramatically|markedly|vastly) (?:\w+ )?(?:advanc|improv|boost|reduc|accelerat|enhanc|simplif|increas|expand|push)\w*', 1.0),
+    # Quantified gains: "by 10x", "3 times faster", "cuts energy use"
+    (r'\b\d+(?:\.\d+)?\s*(?:x|×|times|fold)(?!\w)', 1.0),
+    (r'\b(?:cut|reduc|lower|sav)\w*\b.{0,30}\b(?:energy|power|latency|memory|cost|time)\b', 1.0),
+    # Reported results: "achieves 95.2% accuracy", "improves ... by 3%", "an accuracy of 95%"
+    (r'\b\d+(?:\.\d+)?\s*%\s*(?:\w+\s+){0,2}?(?:accuracy|improvement|gain|reduction|speed-?up|fewer|less|lower|higher|faster)\b', 1.0),
+    (r'\b(?:accuracy|improvement|gain|reduction|speed-?up) of \d+(?:\.\d+)?\s*%', 1.0),
+    (r'\bby \d+(?:\.\d+)?\s*%', 1.0),
+]
+_PATTERNS = [(re.compile(p, re.IGNORECASE), w) for p, w in PRAISE_LEXICON]
+
+# Subtracted from the score of a context that only cites the paper inside a
+# list like [3, 7, 12, 15], such lists rarely carry praise for a single entry
+BARE_LIST_PENALTY = 1.0
+
+# Contexts scoring below this are considered free of evaluative language.
+# None disables the prefilter.
+praise_threshold = 1.0
+
+_stats = {'checked': 0, 'skipped': 0}
+_stats_lock = threading.Lock()
+
+
+def configure_prefilter(threshold):
+    """Set the praise score below which a paper skips the positive comment analysis"""
+    global praise_threshold
+    praise_threshold = threshold
+
+
+def _citation_key(citation_index):
+    # "[12]" -> "12", "(Smith et al., 2023)" -> "Smith et al., 2023"
+    return str(citation_index).strip().strip('[]()').strip()
+
+
+def _group_items(group):
+    items = []
+    for item in re.split(r'[;,]', group):
+        item = item.strip()
+        span = re.fullmatch(r'(\d+)\s*[-–]\s*(\d+)', item)
+        if span:
+            items += [str(n) for n in range(int(span.group(1)), int(span.group(2)) + 1)]
+        elif item:
+            items.append(item)
+    return items
+
+
+def is_bare_list_citation(paragraph, citation_index):
+    """
+    Check whether every mention of the citation is inside a list of citations.
+
+    Args:
+        paragraph (str): Citation context
+        citation_index (str): Citation index, e.g. "[12]"
+
+    Returns:
+        bool: True if the paper is only cited as part of lists like [3, 7, 12, 15]
+    """
+    key = _citation_key(citation_index)
+    if not key.isdigit():
+        # Author-year citations: "(Smith et al., 2023; Lee, 2021)"
+        groups = [g for g in re.findall(r'\(([^()]*)\)', paragraph) if key in g]
+        return bool(groups) and all(len(g.split(';')) > 1 for g in groups)
+    groups = [items for items in (_group_items(g) for g in re.findall(r'\[([^\[\]]*)\]', paragraph))
+              if key in items]
+    return bool(groups) and all(len(items) > 1 for items in groups)
+
+
+_ABBREVIATIONS = ('et al.', 'e.g.', 'i.e.', 'etc.', 'vs.', 'cf.', 'Fig.', 'Eq.', 'Sec.', 'Tab.')
+
+
+def _split_sentences(paragraph):
+    sentences = []
+    for piece in re.split(r'(?<=[.!?])\s+', paragraph.strip()):
+        if sentences and sentences[-1].endswith(_ABBREVIATIONS):
+            sentences[-1] += ' ' + piece
+        elif piece:
+            sentences.append(piece)
+    return sentences
+
+
+def _mentions(sentence, key):
+    if key.isdigit():
+        return any(key in _group_items(g) for g in re.findall(r'\[([^\[\]]*)\]', sentence))
+    # Author-year citations may be written as "Smith et al., 2023" or "Smith et al. (2023)"
+    surname = key.split()[0].strip(',')
+    years = re.findall(r'\d{4}', key)
+    return surname in sentence and all(year in sentence for year in years)
+
+
+def citing_sentences(paragraph, citation_index):
+    """
+    Sentences of a paragraph that contain the citation.
+
+    Returns the whole paragraph when no sentence contains it, e.g. when the
+    LLM returned a paraphrase, so that such contexts are not skipped.
+    """
+    key = _citation_key(citation_index)
+    sentences = [s for s in _split_sentences(paragraph) if _mentions(s, key)]
+    return sentences or [paragraph]
+
+
+def score_context(paragraph, citation_index):
+    """Weighted praise score of the sentences of a paragraph that cite the paper"""
+    context = ' '.join(citing_sentences(paragraph, citation_index))
+    score = sum(w for pattern, w in _PATTERNS if pattern.search(context))
+    if is_bare_list_citation(context, citation_index):
+        score -= BARE_LIST_PENALTY
+    return score
+
+
+def has_evaluative_context(paragraphs, citation_index, threshold=None):
+    """
+    Decide whether any citation context may contain praise.
+
+    Only papers whose contexts all score below the threshold are skipped, the
+    others are analyzed with their paragraphs unchanged.
+
+    Args:
+        paragraphs (list): Paragraphs that contain the citation
+        citation_index (str): Citation index, e.g. "[12]"
+        threshold (float): Minimum score (default: configured praise_threshold)
+
+    Returns:
+        bool: False if the positive comment analysis can be skipped
+    """
+    threshold = praise_threshold if threshold is None else threshold
+    if threshold is None:
+        return True
+    keep = any(score_context(p, citation_index) >= threshold for p in paragraphs)
+    with _stats_lock:
+        _stats['checked'] += 1
+        if not keep:
+            _stats['skipped'] += 1
+    return keep
+
+
+def prefilter_stats():
+    """Number of papers checked and skipped by the prefilter, for the run report"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_prefilter_stats():
+    """Zero the counters, so a report only covers its own run"""
+    with _stats_lock:
+        _stats.update(checked=0, skipped=0)
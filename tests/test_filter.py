@@ -0,0 +1,49 @@
+import json
+import time
+
+import pytest
+
+import filter as paper_filter
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+        (tmp_path / name).write_bytes(b'%PDF stand-in')
+    previous = [{'file': 'a.pdf', 'author': 'A', 'inst': 'I', 'pub': 'P'},
+                {'file': 'b.pdf', 'author': 'B', 'inst': 'I', 'pub': 'P'}]
+    (tmp_path / 'filtered_papers.json').write_text(json.dumps(previous))
+    monkeypatch.setattr(paper_filter, 'process_pdf_name', lambda *args: {})
+    return tmp_path
+
+
+def saved(folder):
+    return sorted(p['file'] for p in json.loads((folder / 'filtered_papers.json').read_text()))
+
+
+def verdicts(monkeypatch, outcomes):
+    def should_include_paper(pdf_path, *args):
+        out = outcomes[pdf_path.rsplit('/', 1)[-1]]
+        return {'author': 'X', 'inst': 'I', 'pub': 'P'} if out is True else out
+    monkeypatch.setattr(paper_filter, 'should_include_paper', should_include_paper)
+
+
+def test_llm_failures_keep_previous_verdicts(folder, monkeypatch):
+    # a: no model server answered, b: now excluded, c: newly included
+    verdicts(monkeypatch, {'a.pdf': None, 'b.pdf': False, 'c.pdf': True})
+
+    report = paper_filter.one_folder(str(folder), {}, 'Me')
+
+    assert saved(folder) == ['a.pdf', 'c.pdf']
+    assert report['failed'] == ['a.pdf']
+    assert report['unprocessed'] == []
+
+
+def test_passed_deadline_keeps_previous_verdicts(folder, monkeypatch):
+    verdicts(monkeypatch, {'a.pdf': False, 'b.pdf': False, 'c.pdf': True})
+
+    report = paper_filter.one_folder(str(folder), {}, 'Me', deadline=time.monotonic() - 1)
+
+    assert saved(folder) == ['a.pdf', 'b.pdf']
+    assert sorted(report['unprocessed']) == ['a.pdf', 'b.pdf', 'c.pdf']
+    assert report['failed'] == []
@@ -0,0 +1,58 @@
+import json
+import time
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import filter_comment
+
+COLUMNS = ['target_title', 'paper_title', 'author', 'institution', 'publication', 'positive_comments']
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / 'title.txt').write_text('My paper')
+    papers = [{'file': name, 'author': 'A', 'inst': 'I', 'pub': 'P'} for name in ('a.pdf', 'b.pdf', 'c.pdf')]
+    (tmp_path / 'filtered_papers.json').write_text(json.dumps(papers))
+    pd.DataFrame([
+        dict(zip(COLUMNS, ['My paper', 'a.pdf', 'A', 'I', 'P', "['a is great']"])),
+        dict(zip(COLUMNS, ['My paper', 'b.pdf', 'A', 'I', 'P', "['b is great']"])),
+    ]).to_csv(tmp_path / 'positive_comments.csv', index=False)
+    return tmp_path
+
+
+def saved(folder):
+    return sorted(pd.read_csv(folder / 'positive_comments.csv')['paper_title'])
+
+
+def outcomes(monkeypatch, results):
+    def process_single_paper(paper_file, *args):
+        result = {'paper_title': paper_file, 'has_positive_comments': False, 'positive_comments': []}
+        if results[paper_file] == 'failed':
+            result['failed'] = True
+        elif results[paper_file]:
+            result |= {'has_positive_comments': True, 'positive_comments': [results[paper_file]]}
+        return result
+    monkeypatch.setattr(filter_comment, 'process_single_paper', process_single_paper)
+
+
+def test_llm_failures_keep_previous_comments(folder, monkeypatch):
+    # a: no model server answered, b: no longer positive, c: newly positive
+    outcomes(monkeypatch, {'a.pdf': 'failed', 'b.pdf': None, 'c.pdf': 'c is great'})
+
+    report = filter_comment.process_papers(str(folder), {})
+
+    assert saved(folder) == ['a.pdf', 'c.pdf']
+    assert report['failed'] == ['a.pdf']
+    assert report['unprocessed'] == []
+
+
+def test_passed_deadline_keeps_previous_comments(folder, monkeypatch):
+    outcomes(monkeypatch, {'a.pdf': None, 'b.pdf': None, 'c.pdf': 'c is great'})
+
+    report = filter_comment.process_papers(str(folder), {}, deadline=time.monotonic() - 1)
+
+    assert saved(folder) == ['a.pdf', 'b.pdf']
+    assert report['unprocessed'] == ['a.pdf', 'b.pdf', 'c.pdf']
+    assert report['failed'] == []
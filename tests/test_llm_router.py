@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_router import LLMError, LLMRouter
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completion endpoint with a configurable behavior"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.end_headers()
+            return
+        time.sleep(self.server.delay)
+        body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': self.server.name}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class APIStatusError(Exception):
+    """Shaped like the OpenAI client's error for non-2xx responses"""
+
+    def __init__(self, status_code):
+        super().__init__(f'Error code: {status_code}')
+        self.status_code = status_code
+
+
+class ModelServiceError(Exception):
+    """Shaped like qwen_agent's wrapper, which leaves code=None for OpenAI errors"""
+
+    def __init__(self, exception=None, code=None, message=None):
+        super().__init__(exception if exception is not None else message)
+        self.exception = exception
+        self.code = code
+        self.message = message
+
+
+class HTTPAssistant:
+    """Minimal stand-in for qwen_agent's Assistant talking to a real server over HTTP"""
+
+    def __init__(self, llm, system_message):
+        self.url = llm['model_server'] + '/chat/completions'
+        self.system_message = system_message
+
+    def run(self, messages):
+        data = json.dumps({'messages': [{'role': 'system', 'content': self.system_message}] + messages}).encode()
+        request = urllib.request.Request(self.url, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                message = json.load(response)['choices'][0]['message']
+        except urllib.error.HTTPError as e:
+            raise ModelServiceError(exception=APIStatusError(e.code))
+        yield [message]
+
+
+@pytest.fixture
+def servers():
+    started = {}
+
+    def start(name, status=200, delay=0.0):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        server.name, server.status, server.delay = name, status, delay
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started[name] = server
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in started.values():
+        server.shutdown()
+        server.server_close()
+
+
+def ask(router):
+    return router.run({'model': 'stand-in'}, 'system', [{'role': 'user', 'content': 'hi'}])[-1]['content']
+
+
+def test_fails_over_from_unavailable_server(servers):
+    router = LLMRouter([servers('down', status=503), servers('slow', delay=0.05)],
+                       {'base_backoff': 10.0}, assistant_cls=HTTPAssistant)
+
+    assert ask(router) == 'slow'
+
+    down, slow = router.metrics()['endpoints']
+    assert (down['requests'], down['errors']) == (1, 1)
+    assert down['last_error'] == 'Error code: 503'
+    assert (slow['requests'], slow['successes']) == (1, 1)
+    assert slow['avg_latency'] >= 0.05
+    assert router.metrics()['retries'] == 1
+    assert router.metrics()['failures'] == 0
+
+
+def test_failed_server_backs_off_and_stays_less_preferred(servers):
+    router = LLMRouter([servers('down', status=503), servers('ok')],
+                       {'base_backoff': 0.05}, assistant_cls=HTTPAssistant)
+    ask(router)
+
+    # While backing off the failed server is skipped entirely
+    assert router.endpoints[0].cooldown_until > time.monotonic()
+    assert ask(router) == 'ok'
+    # After the backoff its failure still counts as high latency
+    time.sleep(0.1)
+    assert ask(router) == 'ok'
+    assert router.metrics()['endpoints'][0]['requests'] == 1
+
+
+def test_spreads_concurrent_requests_by_queue_depth(servers):
+    urls = [servers(name, delay=0.2) for name in ('a', 'b', 'c')]
+    router = LLMRouter(urls, assistant_cls=HTTPAssistant)
+
+    with ThreadPoolExecutor(6) as pool:
+        answers = list(pool.map(lambda _: ask(router), range(6)))
+
+    assert sorted(answers) == ['a', 'a', 'b', 'b', 'c', 'c']
+    assert all(e['max_inflight'] == 2 for e in router.metrics()['endpoints'])
+
+
+def test_raises_after_all_attempts_fail(servers):
+    router = LLMRouter([servers('down1', status=503), servers('down2', status=502)],
+                       {'max_attempts': 2, 'base_backoff': 0.01}, assistant_cls=HTTPAssistant)
+
+    with pytest.raises(LLMError, match='Error code: 50'):
+        ask(router)
+    metrics = router.metrics()
+    assert metrics['failures'] == 1
+    assert sum(e['errors'] for e in metrics['endpoints']) == 2
+
+
+def test_client_errors_are_not_retried(servers):
+    router = LLMRouter([servers('bad', status=400), servers('ok')], assistant_cls=HTTPAssistant)
+
+    with pytest.raises(LLMError, match='Error code: 400'):
+        ask(router)
+    bad, ok = router.metrics()['endpoints']
+    assert ok['requests'] == 0
+    # A bad request does not count against the server
+    assert (bad['requests'], bad['rejected'], bad['errors']) == (1, 1, 0)
+    assert bad['avg_latency'] is None
+    assert router.endpoints[0].cooldown_until <= time.monotonic()
+    assert router.metrics()['retries'] == 0
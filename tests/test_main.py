@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+pytest.importorskip('pandas')
+
+import main
+import prefilter
+
+
+def test_config_file_accepts_comma_separated_stages(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'stages': 'filter, comments', 'targets': 'paper_a'}))
+
+    config = main.load_config(str(path))
+
+    assert config['stages'] == ['filter', 'comments']
+    assert config['targets'] == ['paper_a']
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError):
+        main.load_config(stages=['filter', 'comment'])
+
+
+def test_run_reports_only_its_own_run(tmp_path, monkeypatch):
+    (tmp_path / 'paper_a').mkdir()
+    (tmp_path / 'paper_a' / 'title.txt').write_text('My paper')
+    deadlines = []
+    monkeypatch.setattr(main, 'one_folder', lambda *args: deadlines.append(args[-1]) or {})
+    config = main.load_config(root=str(tmp_path), stages=['filter'], time_budget=0,
+                              report=str(tmp_path / 'run_report.json'))
+
+    prefilter.has_evaluative_context(["As shown in [3]."], "[3]")
+    report = main.run(config)
+
+    # A zero budget is a deadline, not "no limit"
+    assert deadlines[0] is not None
+    assert report['prefilter'] == {'checked': 0, 'skipped': 0}
+    assert report['llm_routers'] == []
@@ -0,0 +1,48 @@
+import time
+
+from parallel import run_parallel
+
+
+def test_runs_every_item_in_order():
+    results, skipped = run_parallel(lambda x: x * x, [3, 1, 2], workers=3)
+
+    assert results == [9, 1, 4]
+    assert skipped == []
+
+
+def test_passed_deadline_skips_every_item():
+    calls = []
+
+    results, skipped = run_parallel(calls.append, ['a', 'b', 'c'], workers=2,
+                                    deadline=time.monotonic() - 1)
+
+    assert calls == []
+    assert results == [None, None, None]
+    assert skipped == ['a', 'b', 'c']
+
+
+def test_items_started_before_the_deadline_finish():
+    deadline = time.monotonic() + 0.2
+
+    def slow(item):
+        time.sleep(0.3)
+        return item.upper()
+
+    results, skipped = run_parallel(slow, ['a', 'b', 'c'], deadline=deadline)
+
+    # 'a' starts in time and still finishes after the deadline, the others never start
+    assert results == ['A', None, None]
+    assert skipped == ['b', 'c']
+
+
+def test_skipped_items_keep_their_order_with_workers():
+    deadline = time.monotonic() + 0.2
+
+    def slow(item):
+        time.sleep(0.3)
+        return item
+
+    results, skipped = run_parallel(slow, list(range(6)), workers=2, deadline=deadline)
+
+    assert results[:2] == [0, 1]
+    assert skipped == [2, 3, 4, 5]
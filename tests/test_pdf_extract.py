@@ -0,0 +1,165 @@
+import pytest
+
+import pdf_extract
+
+
+class StubExtractor:
+    """Extractor serving fixed page texts, None pages return None and Exception pages raise"""
+
+    def __init__(self, name, pages, open_error=None):
+        self.name = name
+        self.pages = pages
+        self.open_error = open_error
+        self.opened = 0
+
+    def available(self):
+        return True
+
+    def open(self, pdf_path):
+        self.opened += 1
+        if self.open_error:
+            raise self.open_error
+        return StubDocument(self.pages)
+
+
+class StubDocument:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def page_text(self, i):
+        if isinstance(self.pages[i], Exception):
+            raise self.pages[i]
+        return self.pages[i]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def extractors(monkeypatch):
+    def install(*stubs):
+        monkeypatch.setattr(pdf_extract, 'EXTRACTORS', {s.name: s for s in stubs})
+        monkeypatch.setattr(pdf_extract, 'backends', [s.name for s in stubs])
+        return stubs
+    return install
+
+
+def test_falls_back_per_page(extractors):
+    extractors(
+        StubExtractor('fast', ['one', None, RuntimeError('broken'), None]),
+        StubExtractor('slow', ['ONE', 'two', 'three', None]),
+    )
+    assert list(pdf_extract.iter_pages('paper.pdf')) == ['one', 'two', 'three', '']
+
+
+def test_unopenable_fallback_is_opened_once(extractors):
+    _, broken, last = extractors(
+        StubExtractor('fast', [None] * 300),
+        StubExtractor('broken', [], open_error=RuntimeError('cannot open')),
+        StubExtractor('last', ['text'] * 300),
+    )
+    assert list(pdf_extract.iter_pages('paper.pdf')) == ['text'] * 300
+    assert broken.opened == 1
+    assert last.opened == 1
+
+
+def test_first_backend_that_opens_sets_page_count(extractors):
+    extractors(
+        StubExtractor('fast', [], open_error=RuntimeError('cannot open')),
+        StubExtractor('slow', ['a', 'b']),
+    )
+    assert list(pdf_extract.iter_pages('paper.pdf')) == ['a', 'b']
+
+
+def test_no_backend_opens_the_file(extractors):
+    extractors(StubExtractor('fast', [], open_error=RuntimeError('cannot open')))
+    with pytest.raises(RuntimeError, match='cannot open'):
+        list(pdf_extract.iter_pages('paper.pdf'))
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extract, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(pdf_extract, 'memory_budget', None)
+    path = tmp_path / 'paper.pdf'
+    path.write_bytes(b'%PDF stand-in')
+    return str(path)
+
+
+def open_pages(extractors, pdf, pages):
+    extractors(StubExtractor('stub', pages))
+    return pdf_extract.open_paper(pdf)
+
+
+def test_pages_and_offsets(extractors, pdf):
+    with open_pages(extractors, pdf, ['aaa', 'bb', 'é']) as paper:
+        assert len(paper) == 3
+        assert paper.offsets == [0, 4, 7, 10]
+        assert paper.pages() == 'aaa\nbb\né\n'
+        assert paper.pages(1, 2) == 'bb\n'
+        assert paper.pages(0, None, 5) == 'aaa\nb'
+        # A cut inside a multi-byte character is dropped instead of failing
+        assert paper.pages(2, 3, 1) == ''
+
+
+def test_head_and_tail_within_budget(extractors, pdf):
+    with open_pages(extractors, pdf, ['title', 'body', 'refs']) as paper:
+        assert paper.head(8) == 'title\nbo'
+        # Whole trailing pages that fit
+        assert paper.tail(10) == 'body\nrefs\n'
+        assert paper.tail(7) == 'refs\n'
+        # The last page alone is larger than the budget: keep its beginning
+        assert paper.tail(3) == 'ref'
+        assert paper.tail() == paper.pages()
+
+
+def test_chunks_within_budget(extractors, pdf):
+    with open_pages(extractors, pdf, ['aaa', 'bbb', 'cccccccc', 'd']) as paper:
+        assert list(paper.chunks(8)) == [(0, 2, 'aaa\nbbb\n'), (2, 3, 'cccccccc'), (3, 4, 'd\n')]
+        assert list(paper.chunks(100)) == [(0, 4, paper.pages())]
+        assert list(paper.chunks()) == [(0, 4, paper.pages())]
+
+
+def test_memory_budget_is_the_default(extractors, pdf, monkeypatch):
+    monkeypatch.setattr(pdf_extract, 'memory_budget', 4)
+    with open_pages(extractors, pdf, ['aaa', 'bbb']) as paper:
+        assert paper.head() == 'aaa\n'
+        assert [c[:2] for c in paper.chunks()] == [(0, 1), (1, 2)]
+
+
+def test_empty_document(extractors, pdf):
+    with open_pages(extractors, pdf, []) as paper:
+        assert len(paper) == 0
+        assert paper.nbytes == 0
+        assert paper.pages() == ''
+        assert paper.head(10) == ''
+        assert paper.tail(10) == ''
+        assert list(paper.chunks(10)) == []
+
+
+def test_cache_is_reused_for_the_same_backends(extractors, pdf):
+    stub, = extractors(StubExtractor('stub', ['text']))
+    first = pdf_extract.extract_to_cache(pdf)
+    assert pdf_extract.extract_to_cache(pdf) == first
+    assert stub.opened == 1
+
+
+def test_cache_key_depends_on_backend_chain(extractors, pdf):
+    extractors(StubExtractor('fast', [None]), StubExtractor('slow', [None]))
+    empty = pdf_extract.extract_to_cache(pdf, ['fast'])
+    both = pdf_extract.extract_to_cache(pdf, ['fast', 'slow'])
+    assert empty != both
+
+    # Installing a backend that can read the page re-extracts it
+    extractors(StubExtractor('fast', [None]), StubExtractor('better', ['found']))
+    with pdf_extract.PaperText(*pdf_extract.extract_to_cache(pdf)) as paper:
+        assert paper.pages() == 'found\n'
+
+
+def test_failed_extraction_leaves_no_cache_entry(extractors, pdf, tmp_path):
+    extractors(StubExtractor('stub', [], open_error=RuntimeError('cannot open')))
+    assert pdf_extract.open_paper(pdf) is None
+    assert list((tmp_path / 'cache').iterdir()) == []
@@ -0,0 +1,62 @@
+import pytest
+
+from prefilter import citing_sentences, has_evaluative_context, is_bare_list_citation, score_context
+
+
+@pytest.mark.parametrize('paragraph, citation_index', [
+    ("Zhang et al. [12] were the first to train spiking transformers from scratch.", "[12]"),
+    ("The recurrent SNN of [12] achieves state-of-the-art accuracy on SHD.", "[12]"),
+    ("Our model builds on [12], which outperforms ANN baselines at a fraction of the energy.", "[12]"),
+    ("Zhang et al. [12] proposed a neuron model that cuts energy use by 10x.", "[12]"),
+    ("Learnable delays [9, 12] set the state-of-the-art on SHD.", "[12]"),
+    ("Smith et al. (2023) pioneered surrogate gradient training of deep SNNs.", "(Smith et al., 2023)"),
+    ("The neuron of [12] is 10× faster than the LIF neuron.", "[12]"),
+    ("Zhang et al. [12] proposed a novel spiking neuron.", "[12]"),
+    ("Recently, [12] introduced a new training method for deep SNNs.", "[12]"),
+    ("Surrogate gradient methods [12] have greatly advanced the field.", "[12]"),
+    ("The SNN of [12] reaches 95.2% accuracy on CIFAR-10.", "[12]"),
+    ("The delay learning of [12] yields an accuracy of 93.1% on SHD.", "[12]"),
+    ("Attention in [12] lowers the error rate by 3.5%.", "[12]"),
+])
+def test_keeps_praise(paragraph, citation_index):
+    assert has_evaluative_context([paragraph], citation_index)
+
+
+@pytest.mark.parametrize('paragraph, citation_index', [
+    ("Spiking neural networks have been studied extensively [3, 7, 12, 15].", "[12]"),
+    ("Prior works [3, 7, 12, 15] achieve high accuracy.", "[12]"),
+    ("We use the data in [12] with a high learning rate.", "[12]"),
+    ("Following [12], we train for 100 epochs and compare with the ANN baseline.", "[12]"),
+    ("Related models are surveyed in (Lee, 2021; Smith et al., 2023).", "(Smith et al., 2023)"),
+    ("We train on 80% of the data released by [12].", "[12]"),
+    ("The 3x3 convolutions follow the design in [12].", "[12]"),
+])
+def test_skips_neutral_citations(paragraph, citation_index):
+    assert not has_evaluative_context([paragraph], citation_index)
+
+
+def test_only_scores_sentences_with_the_citation():
+    paragraph = ("Transformers are the state-of-the-art in language modeling [4]. "
+                 "We adopt the neuron model of Zhang et al. [12]. It outperforms LSTMs [7].")
+    assert citing_sentences(paragraph, "[12]") == ["We adopt the neuron model of Zhang et al. [12]."]
+    assert score_context(paragraph, "[12]") == 0
+
+
+def test_paraphrased_context_falls_back_to_paragraph():
+    paragraph = "This pioneering neuron model outperforms prior designs."
+    assert citing_sentences(paragraph, "[12]") == [paragraph]
+    assert has_evaluative_context([paragraph], "[12]")
+
+
+def test_bare_list_citations():
+    assert is_bare_list_citation("as in [3, 7, 12, 15]", "[12]")
+    assert is_bare_list_citation("as in [10-15]", "[12]")
+    assert not is_bare_list_citation("as in [12] and [3, 12]", "[12]")
+    assert not is_bare_list_citation("as in [3, 7]", "[12]")
+
+
+def test_any_paragraph_above_threshold_keeps_paper():
+    paragraphs = ["Spiking networks [3, 12] are studied widely.", "The method of [12] is remarkably efficient."]
+    assert has_evaluative_context(paragraphs, "[12]")
+    assert not has_evaluative_context(paragraphs[:1], "[12]")
+    assert not has_evaluative_context(paragraphs, "[12]", threshold=5.0)